@@ -6,6 +6,8 @@
 # (at your option) any later version.
 
 import os
+import re
+import time
 
 from senf import uri2fsn, fsnative, fsn2text, path2fsn, bytes2fsn, text2fsn
 
@@ -18,7 +20,8 @@ from quodlibet.qltk.getstring import GetStringDialog
 from quodlibet.qltk.wlw import WaitLoadWindow
 from quodlibet.util import escape
 from quodlibet.util.collection import FileBackedPlaylist
-from quodlibet.util.path import mkdir, uri_is_valid
+from quodlibet.util.path import mkdir, uri_is_valid, normalize_path
+from quodlibet.util.thread import call_async_future, Cancellable
 
 # Directory for playlist files
 PLAYLISTS = os.path.join(quodlibet.get_user_dir(), "playlists")
@@ -26,6 +29,15 @@ assert isinstance(PLAYLISTS, fsnative)
 if not os.path.isdir(PLAYLISTS):
     mkdir(PLAYLISTS)
 
+# Cheap check for a possible URI scheme, before the full validation
+_URI_SCHEME_RE = re.compile(r'^[A-Za-z][A-Za-z0-9+.\-]*:')
+
+# Only ASCII whitespace is stripped from entries, like bytes.strip() does
+_WHITESPACE = " \t\r\n\x0b\x0c"
+
+# The values of all "FileN=..." entries in a PLS file
+_PLS_RE = re.compile(r'(?aim)^[ \t]*file[0-9]*[ \t]*=[ \t]*(.*?)[ \t\r]*$')
+
 
 def confirm_remove_playlist_dialog_invoke(
     parent, playlist, Confirmer=ConfirmationPrompt):
@@ -101,70 +113,139 @@ class GetPlaylistName(GetStringDialog):
 
 def parse_m3u(filelike, pl_name, library=None):
     filenames = []
-    for line in filelike:
-        line = line.strip()
-        if line.startswith(b"#"):
-            continue
-        __attempt_add(line, filenames)
+    lines = [line.strip(_WHITESPACE)
+             for line in _read_text(filelike).split("\n")]
+    for line in lines:
+        if line and not line.startswith("#"):
+            __add_entry(line, filenames)
     return __create_playlist(pl_name, _dir_for(filelike), filenames, library)
 
 
 def parse_pls(filelike, pl_name, library=None):
     filenames = []
-    for line in filelike:
-        line = line.strip()
-        if not line.lower().startswith(b"file"):
-            continue
-        fn = line[line.index(b"=") + 1:].strip()
-        __attempt_add(fn, filenames)
+    for fn in _PLS_RE.findall(_read_text(filelike)):
+        if fn:
+            __add_entry(fn, filenames)
     return __create_playlist(pl_name, _dir_for(filelike), filenames, library)
 
 
-def __attempt_add(filename, filenames):
+def _read_text(filelike):
+    """Returns the whole content of the playlist file as `fsnative`,
+    leaving out lines which can't be converted.
+    """
+
+    data = filelike.read()
     try:
-        filenames.append(bytes2fsn(filename, 'utf-8'))
+        # Usually the whole file can be converted at once
+        return bytes2fsn(data, 'utf-8')
     except ValueError:
-        return
+        lines = []
+        for line in data.split(b"\n"):
+            try:
+                lines.append(bytes2fsn(line, 'utf-8'))
+            except ValueError:
+                continue
+        return fsnative(u"\n").join(lines)
+
+
+def __add_entry(filename, filenames):
+    is_uri = (_URI_SCHEME_RE.match(filename) is not None
+              and uri_is_valid(filename))
+    filenames.append((is_uri, filename))
 
 
 def __create_playlist(name, source_dir, files, library):
     playlist = FileBackedPlaylist.new(PLAYLISTS, name, library=library)
     print_d("Created playlist %s" % playlist)
-    songs = []
+    # Songs repeated in the playlist only need to be loaded once
+    unique = list(dict.fromkeys(files))
+    resolved = {}
+    realpath_cache = {}
+
     win = WaitLoadWindow(
-        None, len(files),
+        None, len(unique),
         _("Importing playlist.\n\n%(current)d/%(total)d songs added."))
     win.show()
-    for i, filename in enumerate(files):
-        if not uri_is_valid(filename):
-            # Plain filename.
-            songs.append(_af_for(filename, library, source_dir))
-        else:
-            try:
-                filename = uri2fsn(filename)
-            except ValueError:
-                # Who knows! Hand it off to GStreamer.
-                songs.append(formats.remote.RemoteFile(filename))
-            else:
-                # URI-encoded local filename.
-                songs.append(_af_for(filename, library, source_dir))
-        if win.step():
-            break
-    win.destroy()
-    playlist.extend(list(filter(None, songs)))
+    # Pumping the main loop for each song can take longer than loading it,
+    # so only update the progress every few songs or after some time
+    stride = max(1, len(unique) // 200)
+    last_step = time.monotonic()
+    stepped = 0
+    # Resolving paths and looking them up in the library is mostly waiting
+    # for the file system, so do it in threads. Reading the tags of songs
+    # not in the library stays in the main thread.
+    cancellable = Cancellable()
+    futures = [
+        call_async_future(_lookup, cancellable,
+                          (entry, library, source_dir, realpath_cache))
+        for entry in unique]
+    try:
+        for i, (entry, future) in enumerate(zip(unique, futures), 1):
+            path, song, is_file = future.result()
+            if song is None:
+                if is_file:
+                    song = formats.MusicFile(path)
+                else:
+                    # Who knows! Hand it off to GStreamer.
+                    song = formats.remote.RemoteFile(path)
+            if song is not None:
+                resolved[entry] = song
+            now = time.monotonic()
+            if (i % stride == 0 or i == len(unique)
+                    or now - last_step > 0.05):
+                last_step = now
+                if win.step(i - stepped):
+                    break
+                stepped = i
+    finally:
+        cancellable.cancel()
+        win.destroy()
+    playlist.extend([resolved[entry] for entry in files
+                     if entry in resolved])
     return playlist
 
 
-def _af_for(filename, library, pl_dir):
+def _lookup(entry, library, pl_dir, realpath_cache=None):
+    """Resolves a playlist entry and looks it up in the library.
+
+    Returns:
+        (fsnative, AudioFile or None, bool): The resolved path, or the URI
+            if it's not a local file, the library song if there is one,
+            and whether the entry is a local file
+    """
+
+    is_uri, filename = entry
+    if is_uri:
+        try:
+            # URI-encoded local filename.
+            filename = uri2fsn(filename)
+        except ValueError:
+            return filename, None, False
+
     full_path = os.path.join(pl_dir, filename)
-    filename = os.path.realpath(full_path)
+    filename = _realpath(full_path, realpath_cache)
 
     af = None
     if library:
-        af = library.get_filename(filename)
-    if af is None:
-        af = formats.MusicFile(filename)
-    return af
+        # Already resolved, get_filename() would resolve it again
+        af = library.get(normalize_path(filename))
+    return filename, af, True
+
+
+def _realpath(path, cache=None):
+    """Like os.path.realpath, but resolves the parent directory only once
+    per `cache` dict. Playlist entries tend to share their directories."""
+
+    if cache is None:
+        return os.path.realpath(path)
+    dirname, base = os.path.split(path)
+    if base in ("", os.curdir, os.pardir) or os.path.islink(path):
+        return os.path.realpath(path)
+    try:
+        real_dir = cache[dirname]
+    except KeyError:
+        real_dir = cache[dirname] = os.path.realpath(dirname)
+    return os.path.join(real_dir, base)
 
 
 def _name_for(filename):
@@ -9,6 +9,7 @@
 """Show directories and files in the default system file browser"""
 
 import os
+import shutil
 import subprocess
 
 from gi.repository import GLib
@@ -17,22 +18,37 @@ from gi.repository import Gtk
 from senf import fsn2uri, fsnative
 
 from quodlibet import print_d
-from quodlibet.util import is_windows, is_osx
+from quodlibet.util import is_windows, is_osx, spawn
 
 
-def show_files(dirname, entries=[]):
+# Looked up once, the PATH isn't expected to change while running
+_GNOME_OPEN = shutil.which("gnome-open")
+_XDG_OPEN = shutil.which("xdg-open")
+_OPEN = shutil.which("open")
+
+# The implementation which last managed to show files
+_last_good_impl = None
+
+
+def show_files(dirname, entries=[], on_error=None):
     """Shows the directory in the default file browser and if passed
     a list of directory entries will highlight those.
 
     Depending on the system/platform this might highlight all files passed,
     or only one of them, or none at all.
 
+    If on_error is passed, programs showing the files are started without
+    waiting for them. If one of them fails, the remaining ways of showing the
+    files are tried then, and if none of them works either, on_error gets
+    called. Otherwise this waits for the programs to exit.
+
     Args:
         dirname (fsnative): Path to the directory
         entries (List[fsnative]): List of (relative) filenames in the directory
-        entries (List[fsnative]): List of (relative) filenames in the directory
+        on_error (Callable[[], None]): Called if showing the files fails
+            after this has returned
     Returns:
-        bool: if the action was successful or not
+        bool: if the action was successful or not (so far, with on_error)
     """
 
     assert isinstance(dirname, fsnative)
@@ -53,27 +69,72 @@ def show_files(dirname, entries=[]):
             _show_files_gnome_open,
         ]
 
-    for impl in implementations:
+    return _show_files_with(implementations, dirname, entries, on_error)
+
+
+def _show_files_with(implementations, dirname, entries, on_error):
+    """Tries the implementations in order until one of them works.
+
+    If on_error is given, each gets passed a callback to call with an error
+    if it fails after returning, which then continues with the remaining
+    implementations. Otherwise they get passed None and have to finish
+    before returning.
+    """
+
+    global _last_good_impl
+
+    if _last_good_impl in implementations:
+        # Try what worked last time first, and don't retry it if it fails
+        implementations = [_last_good_impl] + [
+            impl for impl in implementations if impl is not _last_good_impl]
+
+    for i, impl in enumerate(implementations):
+
+        def failed(error, impl=impl, remaining=implementations[i + 1:]):
+            global _last_good_impl
+
+            print_d("Showing files with %s failed (%s)" % (impl, error))
+            if impl is _last_good_impl:
+                _last_good_impl = None
+            if not _show_files_with(remaining, dirname, entries, on_error):
+                on_error()
+
         try:
-            impl(dirname, entries)
+            impl(dirname, entries, failed if on_error is not None else None)
         except BrowseError as e:
             print_d("Couldn't show files with %s (%s), ignoring." % (impl, e))
+            if impl is _last_good_impl:
+                _last_good_impl = None
             continue
         else:
+            _last_good_impl = impl
             return True
     return False
 
 
-def show_songs(songs):
-    """Returns False if showing any of them failed"""
+def show_songs(songs, on_error=None):
+    """Returns False if showing any of them failed. If on_error is passed,
+    it gets called once if showing any of them fails, right away or later
+    on, see show_files().
+    """
 
     dirs = {}
     for s in songs:
         dirs.setdefault(s("~dirname"), []).append(s("~basename"))
 
+    errors = []
+
+    def error():
+        if not errors:
+            on_error()
+        errors.append(True)
+
     for dirname, entries in sorted(dirs.items()):
-        status = show_files(dirname, entries)
+        status = show_files(
+            dirname, entries, error if on_error is not None else None)
         if not status:
+            if on_error is not None:
+                error()
             return False
     return True
 
@@ -88,13 +149,30 @@ def _get_startup_id():
     return "%s_TIME%d" % (app_name, Gtk.get_current_event_time())
 
 
+_dbus_proxies = {}
+
+
 def _get_dbus_proxy(name, path, iface):
-    bus = Gio.bus_get_sync(Gio.BusType.SESSION, None)
-    return Gio.DBusProxy.new_sync(bus, Gio.DBusProxyFlags.NONE, None,
-                                  name, path, iface, None)
+    """Returns a (cached) proxy for the interface on the session bus"""
+
+    key = (name, path, iface)
+    try:
+        return _dbus_proxies[key]
+    except KeyError:
+        bus = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+        proxy = Gio.DBusProxy.new_sync(bus, Gio.DBusProxyFlags.NONE, None,
+                                       name, path, iface, None)
+        _dbus_proxies[key] = proxy
+        return proxy
+
+
+def _forget_dbus_proxy(name, path, iface):
+    """Drops a cached proxy, so the next call creates a new one"""
 
+    _dbus_proxies.pop((name, path, iface), None)
 
-def _show_files_fdo(dirname, entries):
+
+def _show_files_fdo(dirname, entries, failed):
     # https://www.freedesktop.org/wiki/Specifications/file-manager-interface/
     FDO_PATH = "/org/freedesktop/FileManager1"
     FDO_NAME = "org.freedesktop.FileManager1"
@@ -110,10 +188,11 @@ def _show_files_fdo(dirname, entries):
             item_uri = fsn2uri(os.path.join(dirname, entries[0]))
             dbus_proxy.ShowItems('(ass)', [item_uri], _get_startup_id())
     except GLib.Error as e:
+        _forget_dbus_proxy(FDO_NAME, FDO_PATH, FDO_IFACE)
         raise BrowseError(e)
 
 
-def _show_files_thunar(dirname, entries):
+def _show_files_thunar(dirname, entries, failed):
     # https://git.xfce.org/xfce/thunar/tree/thunar/thunar-dbus-service-infos.xml
     XFCE_PATH = "/org/xfce/FileManager"
     XFCE_NAME = "org.xfce.FileManager"
@@ -129,26 +208,58 @@ def _show_files_thunar(dirname, entries):
             dbus_proxy.DisplayFolderAndSelect(
                 '(ssss)', fsn2uri(dirname), entries[0], "", _get_startup_id())
     except GLib.Error as e:
+        _forget_dbus_proxy(XFCE_NAME, XFCE_PATH, XFCE_IFACE)
         raise BrowseError(e)
 
 
-def _show_files_gnome_open(dirname, *args):
-    try:
-        if subprocess.call(["gnome-open", dirname]) != 0:
-            raise EnvironmentError("gnome-open error return status")
-    except EnvironmentError as e:
-        raise BrowseError(e)
+def _exit_checker(failed):
+    """Returns a spawn() exit callback which passes errors to `failed`"""
+
+    def on_exit(status):
+        try:
+            if hasattr(GLib, "spawn_check_wait_status"):
+                GLib.spawn_check_wait_status(status)
+            else:
+                # deprecated since GLib 2.70
+                GLib.spawn_check_exit_status(status)
+        except GLib.Error as e:
+            failed(e)
+
+    return on_exit
 
 
-def _show_files_xdg_open(dirname, *args):
+def _run(argv, failed):
+    """Runs the program and raises BrowseError if it can't be started.
+
+    If `failed` is None this waits for the program and also raises if it
+    exits with an error. Otherwise `failed` gets called with the error later.
+    """
+
     try:
-        if subprocess.call(["xdg-open", dirname]) != 0:
-            raise EnvironmentError("xdg-open error return status")
-    except EnvironmentError as e:
+        if failed is None:
+            if subprocess.call(argv) != 0:
+                raise EnvironmentError("%s error return status" % argv[0])
+        else:
+            spawn(argv, on_exit=_exit_checker(failed))
+    except (EnvironmentError, GLib.Error) as e:
         raise BrowseError(e)
 
 
-def _show_files_win32(dirname, entries):
+def _show_files_gnome_open(dirname, entries, failed):
+    if not _GNOME_OPEN:
+        raise BrowseError("gnome-open not found")
+
+    _run([_GNOME_OPEN, dirname], failed)
+
+
+def _show_files_xdg_open(dirname, entries, failed):
+    if not _XDG_OPEN:
+        raise BrowseError("xdg-open not found")
+
+    _run([_XDG_OPEN, dirname], failed)
+
+
+def _show_files_win32(dirname, entries, failed):
     if not is_windows():
         raise BrowseError("windows only")
 
@@ -169,12 +280,10 @@ def _show_files_win32(dirname, entries):
             raise BrowseError(e)
 
 
-def _show_files_finder(dirname, *args):
+def _show_files_finder(dirname, entries, failed):
     if not is_osx():
         raise BrowseError("OS X only")
+    if not _OPEN:
+        raise BrowseError("open not found")
 
-    try:
-        if subprocess.call(["open", "-R", dirname]) != 0:
-            raise EnvironmentError("open error return status")
-    except EnvironmentError as e:
-        raise BrowseError(e)
+    _run([_OPEN, "-R", dirname], failed)
@@ -408,14 +408,17 @@ class SongsMenu(Gtk.Menu):
         if show_files and any(is_a_file(s) for s in songs):
             def show_files_cb(menu_item):
                 print_d("Trying to show files...")
-                if not show_songs(songs):
-                    parent = get_menu_item_top_parent(menu_item)
+                parent = get_menu_item_top_parent(menu_item)
+
+                def show_error():
                     msg = ErrorMessage(parent,
                                  _("Unable to show files"),
                                  _("Error showing files, "
                                    "or no program available to show them."))
                     msg.run()
 
+                show_songs(songs, on_error=show_error)
+
             self.separate()
             total = len([s for s in songs if is_a_file(s)])
             text = ngettext(
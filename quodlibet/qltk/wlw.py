@@ -85,9 +85,9 @@ class WaitLoadBase:
     def __cancel_clicked(self, button):
         self.quit = True
 
-    def step(self, **values):
-        """Advance the counter by one. Arguments are applied to the
-        originally-supplied text as a format string.
+    def step(self, steps=1, **values):
+        """Advance the counter by `steps`, one by default. Keyword arguments
+        are applied to the originally-supplied text as a format string.
 
         This function doesn't return if the dialog is paused (though
         the GTK main loop will still run), and returns True if stop
@@ -95,7 +95,7 @@ class WaitLoadBase:
         """
 
         if self.count:
-            self.current += 1
+            self.current += steps
             self._progress.set_fraction(
                 max(0, min(1, self.current / float(self.count))))
         else:
@@ -226,8 +226,8 @@ class WaitLoadBar(WaitLoadBase, Gtk.HBox):
         for child in self.get_children():
             child.show_all()
 
-    def step(self, **values):
-        ret = super().step(**values)
+    def step(self, steps=1, **values):
+        ret = super().step(steps, **values)
         params = {"current": format_int_locale(self.current),
                   "all": format_int_locale(self.count)}
         self._progress.set_text(_("%(current)s of %(all)s") % params)
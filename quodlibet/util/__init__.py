@@ -577,20 +577,33 @@ def pattern(pat, cap=True, esc=False, markup=False):
     return p.format(fakesong)
 
 
-def spawn(argv, stdout=False):
+def spawn(argv, stdout=False, on_exit=None):
     """Asynchronously run a program. argv[0] is the executable name, which
     must be fully qualified or in the path. If stdout is True, return
     a file object corresponding to the child's standard output; otherwise,
     return the child's process ID.
 
+    If on_exit is given, it gets called from the main loop with the wait
+    status of the child once it has exited.
+
     argv must be strictly str objects to avoid encoding confusion.
     """
 
     from gi.repository import GLib
 
+    flags = GLib.SpawnFlags.SEARCH_PATH
+    if on_exit is not None:
+        flags |= GLib.SpawnFlags.DO_NOT_REAP_CHILD
+
     print_d("Running %r" % argv)
-    args = GLib.spawn_async(argv=argv, flags=GLib.SpawnFlags.SEARCH_PATH,
-                            standard_output=stdout)
+    args = GLib.spawn_async(argv=argv, flags=flags, standard_output=stdout)
+
+    if on_exit is not None:
+        def child_exited(pid, status):
+            GLib.spawn_close_pid(pid)
+            on_exit(status)
+
+        GLib.child_watch_add(GLib.PRIORITY_DEFAULT, args[0], child_exited)
 
     if stdout:
         return os.fdopen(args[2])
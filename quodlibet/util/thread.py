@@ -141,6 +141,27 @@ def call_async(function, cancellable, callback, args=None, kwargs=None):
     _call_async(Priority.HIGH, function, cancellable, callback, args, kwargs)
 
 
+def call_async_future(function, cancellable, args=None, kwargs=None):
+    """Like call_async, but returns a `concurrent.futures.Future` for the
+    result instead of passing it to a callback, for callers waiting for it
+    themselves.
+
+    `function` doesn't get called if `cancellable` gets cancelled before
+    it's scheduled, the result is None then.
+    """
+
+    assert cancellable is not None
+    assert function is not None
+
+    if args is None:
+        args = tuple()
+    if kwargs is None:
+        kwargs = {}
+
+    pool = _get_pool(Priority.HIGH)
+    return pool.submit(_wrap_function(function, cancellable, args, kwargs))
+
+
 def call_async_background(function, cancellable, callback, args=None,
                           kwargs=None):
     """Same as call_async but for background tasks (network etc.)"""
@@ -10,21 +10,24 @@ from quodlibet import app
 from quodlibet import qltk
 from quodlibet.browsers.playlists.prefs import DEFAULT_PATTERN_TEXT
 from quodlibet.browsers.playlists.util import PLAYLISTS, parse_m3u, \
-    parse_pls, _name_for
+    parse_pls, _name_for, _realpath
 from quodlibet.qltk.songlist import DND_QL
+from quodlibet.qltk.wlw import WaitLoadWindow
 from quodlibet.util.collection import FileBackedPlaylist
-from tests import TestCase, get_data_path, mkdtemp, _TEMP_DIR, \
+from tests import TestCase, skipIf, get_data_path, mkdtemp, _TEMP_DIR, \
     init_fake_app, destroy_fake_app
 from tests.gtk_helpers import MockSelData
-from .helper import dummy_path, __, temp_filename
+from .helper import dummy_path, __, temp_filename, capture_output
 
 import os
 import shutil
+from unittest.mock import patch
 
 from quodlibet.browsers.playlists import PlaylistsBrowser
 from quodlibet.library import SongFileLibrary
 import quodlibet.config
 from quodlibet.formats import AudioFile
+from quodlibet.util import is_windows
 from quodlibet.util.path import mkdir
 from quodlibet.library.librarians import SongLibrarian
 from quodlibet.library.libraries import FileLibrary
@@ -43,7 +46,7 @@ class TParsePlaylistMixin:
 
     def test_parse_empty(self):
         with temp_filename() as name:
-            with open(name) as f:
+            with open(name, "rb") as f:
                 pl = self.Parse(f, name)
         self.failIf(pl)
         pl.delete()
@@ -73,16 +76,133 @@ class TParsePlaylistMixin:
         self.failUnlessEqual(pl[0]("title"), "Silence")
         pl.delete()
 
+    def test_parse_duplicates(self):
+        target = fsn2bytes(get_data_path("silence-44-s.ogg"), "utf-8")
+        target = self.prefix + target + b"\n"
+        with temp_filename() as name:
+            with open(name, "wb") as f:
+                f.write(target * 2)
+            with open(name, "rb") as f:
+                pl = self.Parse(f, name)
+        self.failUnlessEqual(len(pl), 2)
+        self.failUnless(pl[0] is pl[1])
+        pl.delete()
+
+    def test_parse_skips_invalid(self):
+        target = fsn2bytes(get_data_path("silence-44-s.ogg"), "utf-8")
+        with temp_filename() as name:
+            with open(name, "wb") as f:
+                f.write(self.prefix + b"foo\x00bar\n" + self.prefix + target)
+            with open(name, "rb") as f:
+                pl = self.Parse(f, name)
+        self.failUnlessEqual(len(pl), 1)
+        self.failUnlessEqual(pl[0]("title"), "Silence")
+        pl.delete()
+
 
 class TParseM3U(TestCase, ConfigSetupMixin, TParsePlaylistMixin):
     Parse = staticmethod(parse_m3u)
     prefix = b""
 
+    def test_parse_extended(self):
+        target = fsn2bytes(get_data_path("silence-44-s.ogg"), "utf-8")
+        with temp_filename() as name:
+            with open(name, "wb") as f:
+                f.write(b"#EXTM3U\r\n\r\n#EXTINF:3,Silence\r\n  " +
+                        target + b"  \r\n")
+            with open(name, "rb") as f:
+                pl = self.Parse(f, name)
+        self.failUnlessEqual(len(pl), 1)
+        self.failUnlessEqual(pl[0]("title"), "Silence")
+        pl.delete()
+
+    def _library_playlist(self, count):
+        """Returns a library with `count` songs, an M3U file listing them
+        and the songs"""
+
+        dir_ = os.path.realpath(mkdtemp())
+        self.addCleanup(shutil.rmtree, dir_)
+        lib = FileLibrary()
+        self.addCleanup(lib.destroy)
+        paths = [os.path.join(dir_, "%d.mp3" % i) for i in range(count)]
+        songs = [AudioFile({"~filename": path}) for path in paths]
+        for song in songs:
+            song.sanitize()
+        lib.add(songs)
+        name = os.path.join(dir_, "test.m3u")
+        with open(name, "wb") as f:
+            f.write(b"\n".join(fsn2bytes(p, "utf-8") for p in paths))
+        return lib, name, songs
+
+    def test_parse_library_songs_not_resolved(self):
+        lib, name, songs = self._library_playlist(5)
+        with open(name, "rb") as f:
+            with patch("os.path.realpath", wraps=os.path.realpath) as rp:
+                pl = self.Parse(f, name, library=lib)
+        self.failUnlessEqual(list(pl), songs)
+        resolved = {c[0][0] for c in rp.call_args_list}
+        self.failIf(resolved & {s("~filename") for s in songs})
+        pl.delete()
+
+    def test_parse_stopped(self):
+        lib, name, songs = self._library_playlist(5)
+        with open(name, "rb") as f:
+            with patch.object(WaitLoadWindow, "step", return_value=True):
+                pl = self.Parse(f, name, library=lib)
+        self.failUnlessEqual(list(pl), songs[:1])
+        pl.delete()
+
+    def test_parse_lookup_error(self):
+        lib, name, songs = self._library_playlist(5)
+        with open(name, "rb") as f:
+            with patch("quodlibet.browsers.playlists.util._realpath",
+                       side_effect=OSError), \
+                    patch.object(WaitLoadWindow, "destroy", autospec=True,
+                                 side_effect=Gtk.Window.destroy) as destroy, \
+                    capture_output():
+                self.assertRaises(OSError, self.Parse, f, name, library=lib)
+        self.failUnless(destroy.called)
+
+    def test_parse_keeps_unicode_whitespace(self):
+        with temp_filename() as name:
+            with open(name, "wb") as f:
+                f.write(u"\u00a0foo\u00a0\n".encode("utf-8"))
+            with open(name, "rb") as f:
+                with patch("quodlibet.browsers.playlists.util."
+                           "__create_playlist") as create:
+                    self.Parse(f, name)
+        files = create.call_args[0][2]
+        self.failUnlessEqual(files, [(False, u"\u00a0foo\u00a0")])
+
 
 class TParsePLS(TestCase, ConfigSetupMixin, TParsePlaylistMixin):
     Parse = staticmethod(parse_pls)
     prefix = b"File1="
 
+    def test_parse_full(self):
+        target = fsn2bytes(get_data_path("silence-44-s.ogg"), "utf-8")
+        with temp_filename() as name:
+            with open(name, "wb") as f:
+                f.write(b"[playlist]\r\nfile1 = " + target +
+                        b"\r\nTitle1=Foo\r\nFile2=\r\nNumberOfEntries=2\r\n")
+            with open(name, "rb") as f:
+                pl = self.Parse(f, name)
+        self.failUnlessEqual(len(pl), 1)
+        self.failUnlessEqual(pl[0]("title"), "Silence")
+        pl.delete()
+
+    def test_parse_ascii_keys_only(self):
+        with temp_filename() as name:
+            with open(name, "wb") as f:
+                f.write(u"F\u0130LE1=foo\nf\u0131le2=bar\nFILE3=baz\n"
+                        .encode("utf-8"))
+            with open(name, "rb") as f:
+                with patch("quodlibet.browsers.playlists.util."
+                           "__create_playlist") as create:
+                    self.Parse(f, name)
+        files = create.call_args[0][2]
+        self.failUnlessEqual(files, [(False, u"baz")])
+
 
 class TPlaylistIntegration(TestCase):
     DUPLICATES = 1
@@ -448,3 +568,27 @@ class TPlaylistUtils(TestCase):
 
     def test_naming_default(self):
         self.failUnlessEqual(_name_for(''), __('New Playlist'))
+
+    def test_realpath_cached(self):
+        dir_ = os.path.realpath(mkdtemp())
+        try:
+            cache = {}
+            path = os.path.join(dir_, "foo", "..", "bar.mp3")
+            self.assertEqual(_realpath(path, cache),
+                             os.path.join(dir_, "bar.mp3"))
+            self.assertEqual(_realpath(path, cache), os.path.realpath(path))
+            self.assertEqual(len(cache), 1)
+        finally:
+            shutil.rmtree(dir_)
+
+    @skipIf(is_windows(), "no symlink")
+    def test_realpath_symlink(self):
+        dir_ = os.path.realpath(mkdtemp())
+        try:
+            target = os.path.join(dir_, "target.mp3")
+            link = os.path.join(dir_, "link.mp3")
+            open(target, "wb").close()
+            os.symlink(target, link)
+            self.assertEqual(_realpath(link, {}), target)
+        finally:
+            shutil.rmtree(dir_)
@@ -0,0 +1,138 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+from unittest.mock import patch
+
+from gi.repository import GLib
+from senf import fsnative
+
+from tests import TestCase, skipIf
+
+from quodlibet.formats import AudioFile
+from quodlibet.qltk import showfiles
+from quodlibet.qltk.showfiles import BrowseError, _show_files_with, \
+    _exit_checker, show_songs
+from quodlibet.util import is_windows, spawn
+
+
+class TShowFilesWith(TestCase):
+
+    def setUp(self):
+        showfiles._last_good_impl = None
+        self.called = []
+        self.failed = {}
+        self.errors = []
+
+    def tearDown(self):
+        showfiles._last_good_impl = None
+
+    def _impl(self, name, works=True):
+        def impl(dirname, entries, failed):
+            self.called.append(name)
+            if not works:
+                raise BrowseError(name)
+            self.failed[name] = failed
+        return impl
+
+    def _show(self, implementations):
+        return _show_files_with(
+            implementations, "dir", [], lambda: self.errors.append(True))
+
+    def test_first_working(self):
+        a, b = self._impl("a", works=False), self._impl("b")
+        self.assertTrue(self._show([a, b]))
+        self.assertEqual(self.called, ["a", "b"])
+        self.assertIs(showfiles._last_good_impl, b)
+
+    def test_none_working(self):
+        a, b = self._impl("a", works=False), self._impl("b", works=False)
+        self.assertFalse(self._show([a, b]))
+        self.assertIsNone(showfiles._last_good_impl)
+        self.assertFalse(self.errors)
+
+    def test_last_good_first(self):
+        a, b = self._impl("a", works=False), self._impl("b")
+        self._show([a, b])
+        del self.called[:]
+        self.assertTrue(self._show([a, b]))
+        self.assertEqual(self.called, ["b"])
+
+    def test_last_good_cleared(self):
+        a, b = self._impl("a"), self._impl("b", works=False)
+        showfiles._last_good_impl = b
+        self.assertTrue(self._show([a, b]))
+        self.assertEqual(self.called, ["b", "a"])
+        self.assertIs(showfiles._last_good_impl, a)
+
+    def test_failed_later(self):
+        a, b = self._impl("a"), self._impl("b")
+        self.assertTrue(self._show([a, b]))
+        self.assertIs(showfiles._last_good_impl, a)
+        self.failed["a"](BrowseError("exit status 1"))
+        self.assertEqual(self.called, ["a", "b"])
+        self.assertIs(showfiles._last_good_impl, b)
+        self.assertFalse(self.errors)
+
+    def test_failed_later_none_left(self):
+        a, b = self._impl("a"), self._impl("b", works=False)
+        self.assertTrue(self._show([a, b]))
+        self.failed["a"](BrowseError("exit status 1"))
+        self.assertEqual(self.called, ["a", "b"])
+        self.assertIsNone(showfiles._last_good_impl)
+        self.assertEqual(self.errors, [True])
+
+    def test_no_on_error(self):
+        a = self._impl("a")
+        self.assertTrue(_show_files_with([a], "dir", [], None))
+        self.assertIsNone(self.failed["a"])
+
+
+class TShowSongs(TestCase):
+
+    def test_on_error_once(self):
+        songs = [AudioFile({"~filename": fsnative(u"/a/foo")}),
+                 AudioFile({"~filename": fsnative(u"/b/bar")})]
+        callbacks = []
+        errors = []
+
+        def show_files(dirname, entries, on_error):
+            callbacks.append(on_error)
+            return len(callbacks) == 1
+
+        with patch.object(showfiles, "show_files", show_files):
+            self.assertFalse(
+                show_songs(songs, on_error=lambda: errors.append(True)))
+        self.assertEqual(errors, [True])
+        callbacks[0]()
+        self.assertEqual(errors, [True])
+
+
+@skipIf(is_windows(), "no true/false")
+class TExitChecker(TestCase):
+
+    def _run(self, argv):
+        loop = GLib.MainLoop()
+        errors = []
+
+        def failed(error):
+            errors.append(error)
+
+        checker = _exit_checker(failed)
+
+        def on_exit(status):
+            checker(status)
+            loop.quit()
+
+        spawn(argv, on_exit=on_exit)
+        loop.run()
+        return errors
+
+    def test_success(self):
+        self.assertEqual(self._run(["true"]), [])
+
+    def test_failure(self):
+        errors = self._run(["false"])
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(isinstance(errors[0], GLib.Error))
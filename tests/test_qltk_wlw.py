@@ -61,6 +61,12 @@ class TWaitLoadWindow(TestCase):
         self.failIf(self.wlw.step())
         self.failUnlessEqual(self.wlw.current, 3)
 
+    def test_step_many(self):
+        self.failIf(self.wlw.step(3))
+        self.failUnlessEqual(self.wlw.current, 3)
+        self.failIf(self.wlw.step())
+        self.failUnlessEqual(self.wlw.current, 4)
+
     def test_destroy(self):
         self.wlw.destroy()
         self.failUnlessEqual(self.parent.count, 0)
@@ -973,6 +973,32 @@ class TMainRunner(TestCase):
         thread.join()
 
 
+@skipIf(util.is_windows(), "no true/false")
+class Tspawn(TestCase):
+
+    def _exit_status(self, argv):
+        from gi.repository import GLib
+
+        loop = GLib.MainLoop()
+        statuses = []
+
+        def on_exit(status):
+            statuses.append(status)
+            loop.quit()
+
+        self.assertTrue(util.spawn(argv, on_exit=on_exit))
+        loop.run()
+        return statuses
+
+    def test_on_exit_success(self):
+        self.assertEqual(self._exit_status(["true"]), [0])
+
+    def test_on_exit_failure(self):
+        statuses = self._exit_status(["false"])
+        self.assertEqual(len(statuses), 1)
+        self.assertNotEqual(statuses[0], 0)
+
+
 class Tconnect_destroy(TestCase):
 
     def test_main(self):
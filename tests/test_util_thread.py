@@ -8,11 +8,12 @@
 import threading
 
 from tests import TestCase
+from .helper import capture_output
 
 from gi.repository import Gtk
 
 from quodlibet.util.thread import call_async, call_async_background, \
-    Cancellable, terminate_all
+    call_async_future, Cancellable, terminate_all
 
 
 class Tcall_async(TestCase):
@@ -59,5 +60,29 @@ class Tcall_async(TestCase):
         while Gtk.events_pending():
             Gtk.main_iteration()
 
+    def test_future(self):
+        future = call_async_future(
+            lambda i: (i, threading.current_thread().name), Cancellable(),
+            args=(42,))
+        value, name = future.result()
+        self.assertEqual(value, 42)
+        self.assertNotEqual(name, threading.current_thread().name)
+
+    def test_future_cancel(self):
+        def func():
+            assert 0
+
+        cancel = Cancellable()
+        cancel.cancel()
+        self.assertIsNone(call_async_future(func, cancel).result())
+
+    def test_future_exception(self):
+        def func():
+            raise KeyError
+
+        with capture_output():
+            future = call_async_future(func, Cancellable())
+            self.assertRaises(KeyError, future.result)
+
     def test_terminate_all(self):
         terminate_all()